@@ -1,4 +1,4 @@
 __version__ = '0.1.0'
 
 
-from heatfall.heat import plot_heat_hashes, plot_heat_h3s
\ No newline at end of file
+from heatfall.heat import plot_heat_hashes, plot_heat_h3s, plot_heat_hashes_tiled, plot_heat_h3s_tiled
\ No newline at end of file
@@ -0,0 +1,16 @@
+"""
+Array helpers shared by the plotting functions and the encoders.
+"""
+
+import numpy as np
+
+
+def float_array(values) -> np.ndarray:
+    """Return values as a contiguous float64 array, leaving float32 arrays uncopied.
+
+    Comparing a float32 coordinate with the float64 interval midpoints of
+    the geohash encoder is exact, so float32 input encodes exactly as if
+    it had been upcast.
+    """
+    dtype = np.float32 if getattr(values, 'dtype', None) == np.float32 else np.float64
+    return np.ascontiguousarray(values, dtype=dtype)
@@ -0,0 +1,33 @@
+"""
+Numba CUDA batch geohash encoder.
+"""
+
+import numpy as np
+from numba import cuda
+
+from heatfall._nbgeohash import encode_code, validate_points
+
+
+THREADS_PER_BLOCK = 256
+
+encode_code_device = cuda.jit(device=True)(encode_code.py_func)
+
+
+@cuda.jit
+def encode_codes_kernel(lats, lons, precision, out):
+    i = cuda.grid(1)  # type: ignore[attr-defined]  # numba adds the CUDA intrinsics at runtime
+    if i < lats.shape[0]:
+        out[i] = encode_code_device(lats[i], lons[i], precision)
+
+
+def encode_geohash_codes_cuda(lats, lons, precision: int) -> np.ndarray:
+    """Return the integer geohash codes of the points, encoded on the GPU."""
+    if not cuda.is_available():
+        raise RuntimeError('No CUDA device is available')
+    lats, lons = validate_points(lats, lons, precision)
+    out = cuda.device_array(lats.size, dtype=np.uint64)
+    blocks = max(1, -(-lats.size // THREADS_PER_BLOCK))
+    encode_codes_kernel[blocks, THREADS_PER_BLOCK](
+        cuda.to_device(lats), cuda.to_device(lons), precision, out)
+    codes: np.ndarray = out.copy_to_host()
+    return codes
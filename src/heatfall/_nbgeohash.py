@@ -0,0 +1,96 @@
+"""
+Numba batch geohash encoder.
+"""
+
+import numpy as np
+from numba import njit, prange
+
+from heatfall._arrays import float_array
+
+
+BASE32 = np.frombuffer(b'0123456789bcdefghjkmnpqrstuvwxyz', dtype=np.uint8)
+
+
+@njit(cache=True)
+def encode_code(lat, lon, precision):
+    """Return the geohash of a point as an integer of 5 * precision bits."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    even = True
+    code = 0
+    for _ in range(5 * precision):
+        code <<= 1
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                code |= 1
+                lon_lo = mid
+            else:
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                code |= 1
+                lat_lo = mid
+            else:
+                lat_hi = mid
+        even = not even
+    return code
+
+
+@njit(parallel=True, cache=True)
+def encode_many(lats, lons, precision, out):
+    """Write the base32 geohash characters of each point into out.
+
+    out must be a (N, precision) uint8 array.
+    """
+    for i in prange(lats.shape[0]):
+        code = encode_code(lats[i], lons[i], precision)
+        for j in range(precision - 1, -1, -1):
+            out[i, j] = BASE32[code & 31]
+            code >>= 5
+
+
+@njit(parallel=True, cache=True)
+def encode_many_codes(lats, lons, precision, out):
+    """Write the integer geohash code of each point into the uint64 array out."""
+    for i in prange(lats.shape[0]):
+        out[i] = encode_code(lats[i], lons[i], precision)
+
+
+def validate_points(lats, lons, precision: int):
+    """Return lats and lons as flat contiguous float arrays."""
+    if isinstance(precision, bool) or not isinstance(precision, int) or not 1 <= precision <= 12:
+        raise ValueError(f'Precision must be an integer between 1 and 12, got {precision}')
+    lats = float_array(lats)
+    lons = float_array(lons)
+    if lats.shape != lons.shape:
+        raise ValueError(
+            f'Latitude and longitude lists must have same length, got {lats.size} and {lons.size}')
+    return lats.ravel(), lons.ravel()
+
+
+def encode_geohashes(lats, lons, precision: int) -> np.ndarray:
+    """Return the geohashes of the points as a (N,) unicode array."""
+    lats, lons = validate_points(lats, lons, precision)
+    out = np.empty((lats.size, precision), dtype=np.uint8)
+    encode_many(lats, lons, precision, out)
+    return out.view(f'S{precision}').ravel().astype(f'U{precision}')
+
+
+def encode_geohash_codes(lats, lons, precision: int) -> np.ndarray:
+    """Return the geohashes of the points as (N,) uint64 integer codes.
+
+    Codes sort in the same order as their geohash strings.
+    """
+    lats, lons = validate_points(lats, lons, precision)
+    out = np.empty(lats.size, dtype=np.uint64)
+    encode_many_codes(lats, lons, precision, out)
+    return out
+
+
+def codes_to_geohashes(codes: np.ndarray, precision: int) -> np.ndarray:
+    """Return the geohash strings of integer codes as a (N,) unicode array."""
+    shifts = np.arange(5 * (precision - 1), -1, -5, dtype=np.uint64)
+    chars = BASE32[(np.asarray(codes, dtype=np.uint64)[:, None] >> shifts) & np.uint64(31)]
+    return np.ascontiguousarray(chars).view(f'S{precision}').ravel().astype(f'U{precision}')
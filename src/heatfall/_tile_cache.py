@@ -0,0 +1,105 @@
+"""
+On-disk LRU cache for map tiles.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+import staticmaps
+
+
+DEFAULT_CACHE_DIR = Path('~/.cache/heatfall').expanduser()
+MAX_TILES = 20000
+eviction_lock = threading.Lock()
+
+
+class CachingTileDownloader(staticmaps.TileDownloader):
+    """Tile downloader that keeps fetched tiles on disk, keyed by their URL.
+
+    Tiles go to the cache_dir the context passes in, or to the
+    downloader's own cache_dir when that is None. Tiles are written
+    atomically, so renders running in parallel processes never read a
+    partially written tile. Each directory holds at most max_tiles tiles;
+    past that the least recently used are removed.
+    """
+    def __init__(
+        self,
+        base_downloader: Optional[staticmaps.TileDownloader] = None,
+        cache_dir=DEFAULT_CACHE_DIR,
+        max_tiles: int = MAX_TILES
+    ) -> None:
+        super().__init__()
+        self._base_downloader = base_downloader or staticmaps.TileDownloader()
+        self._tile_cache_dir = Path(cache_dir)
+        self._max_tiles = max_tiles
+        self._tile_counts: Dict[Path, int] = {}
+
+    def set_user_agent(self, user_agent: str) -> None:
+        super().set_user_agent(user_agent)
+        self._base_downloader.set_user_agent(user_agent)
+
+    def tile_path(self, cache_dir: Optional[str], url: str) -> Path:
+        root = self._tile_cache_dir if cache_dir is None else Path(cache_dir)
+        return root / f'{hashlib.sha256(url.encode()).hexdigest()}.png'
+
+    def get(self, provider: staticmaps.TileProvider, cache_dir: str, zoom: int, x: int, y: int) -> Optional[bytes]:
+        url = provider.url(zoom, x, y)
+        if url is None:
+            return None
+        path = self.tile_path(cache_dir, url)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            pass
+        else:
+            # The modification time records when a tile was last used.
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            return data
+        tile: Optional[bytes] = self._base_downloader.get(provider, None, zoom, x, y)
+        if tile is not None:
+            self.write_tile(path, tile)
+            self.evict(path.parent)
+        return tile
+
+    def write_tile(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def evict(self, root: Path) -> None:
+        """Remove the least recently used tiles once root holds more than max_tiles.
+
+        Trims down to 90% of max_tiles so the directory is not rescanned on every write.
+        """
+        with eviction_lock:
+            count = self._tile_counts.get(root)
+            count = sum(1 for _ in root.glob('*.png')) if count is None else count + 1
+            if count > self._max_tiles:
+                tiles = []
+                for tile in root.glob('*.png'):
+                    try:
+                        tiles.append((tile.stat().st_mtime, tile))
+                    except FileNotFoundError:
+                        pass
+                tiles.sort()
+                keep = int(self._max_tiles * 0.9)
+                for _, tile in tiles[:max(0, len(tiles) - keep)]:
+                    try:
+                        tile.unlink()
+                    except FileNotFoundError:
+                        pass
+                count = min(len(tiles), keep)
+            self._tile_counts[root] = count
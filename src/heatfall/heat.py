@@ -2,15 +2,47 @@
 Functions for plotting heatmaps of points.
 """
 
-from typing import List, Optional
+import multiprocessing
+import os
+import pickle
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from PIL import Image
 
 import staticmaps
+import s2sphere
 import pygeodesy
 from range_key_dict import RangeKeyDict
 from geodude import calculate_geohashes
-from tinytim.columns import value_counts
 from more_itertools import numeric_range
+import numpy as np
 import h3
+import h3.api.numpy_int as h3i
+
+from heatfall._arrays import float_array
+from heatfall._tile_cache import DEFAULT_CACHE_DIR, CachingTileDownloader
+
+try:
+    from h3ronpy import vector as h3vector
+except ImportError:
+    h3vector = None
+
+try:
+    import shapely
+except ImportError:
+    shapely = None
+
+try:
+    from heatfall._nbgeohash import codes_to_geohashes, encode_geohash_codes, encode_geohashes
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
 
 
 tp = staticmaps.tile_provider_OSM
@@ -22,9 +54,28 @@ TGREEN = staticmaps.Color(0, 255, 0, 100)
 GREEN = staticmaps.GREEN
 TBLUE = staticmaps.Color(0, 0, 255, 100)
 BLUE = staticmaps.BLUE
+TILE_WORKERS = 2
+tile_downloader = CachingTileDownloader(staticmaps.TileDownloader())
+# staticmaps.create_latlng only forwards to this, so call it directly.
+from_degrees = s2sphere.LatLng.from_degrees
+GEOHASH_BASE32 = {c: i for i, c in enumerate('0123456789bcdefghjkmnpqrstuvwxyz')}
+GeohashDecoder = Callable[[str], Tuple[float, float, float, float]]
+GEOHASH_DECODERS: Dict[int, GeohashDecoder] = {}
+MAX_COMPILED_PRECISION = 12
+local = threading.local()
+worker_context: Optional['Context'] = None
 
 
 class Context(staticmaps.Context):
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        """Return the context to its freshly constructed state so it can draw a new map."""
+        super().__init__()
+        self.set_tile_downloader(tile_downloader)
+        self.set_cache_dir(str(DEFAULT_CACHE_DIR))
+
     def add_hash_poly(
         self,
         h,
@@ -78,24 +129,176 @@ class Context(staticmaps.Context):
         for lat, lon, id, day in zip(cluster.lats, cluster.lons, cluster.ids, cluster.days):
             if colors is not None:
                 color = colors[id]
-            point = staticmaps.create_latlng(lat, lon)
+            point = from_degrees(lat, lon)
             self.add_object(staticmaps.Marker(point, color=color, size=size))
 
-    def add_heat_hashes(self, lats, lons, precision):
-        hashes = calculate_geohashes(lats, lons, precision)
-        counts = dict(value_counts(hashes))
-        colors = density_colors(list(counts.values()))
-        for h, count in counts.items():
-            c = colors[count]
-            self.add_hash_poly(h, c, 1, staticmaps.TRANSPARENT)
+    def add_heat_hashes(
+        self,
+        lats,
+        lons,
+        precision,
+        max_bins: Optional[int] = None,
+        min_count: int = 1,
+        backend: str = 'cpu'
+    ) -> None:
+        cells, counts = count_hashes(lats, lons, precision, backend)
+        if not self.add_heat_polys(make_hash_polys, cells, counts, max_bins, min_count):
+            self.add_bounds(point_bounds(lats, lons))
 
-    def add_heat_h3s(self, lats, lons, precision: int) -> None:
+    def add_heat_h3s(
+        self,
+        lats,
+        lons,
+        precision: int,
+        max_bins: Optional[int] = None,
+        min_count: int = 1
+    ) -> None:
         hashes = calculate_h3_hashes(lats, lons, precision)
-        counts = dict(value_counts(hashes))
-        colors = density_colors(list(counts.values()))
-        for h, count in counts.items():
-            c = colors[count]
-            self.add_h3_poly(h, c, 1, staticmaps.TRANSPARENT)
+        cells, counts = np.unique(hashes, return_counts=True)
+        if not self.add_heat_polys(make_h3_polys, cells, counts, max_bins, min_count):
+            self.add_bounds(point_bounds(lats, lons))
+
+    def add_heat_polys(
+        self,
+        make_polys,
+        cells: np.ndarray,
+        counts: np.ndarray,
+        max_bins: Optional[int] = None,
+        min_count: int = 1
+    ) -> int:
+        """Add an area colored by count for each cell with at least min_count points.
+
+        Returns how many areas were added. When min_count filters out every
+        cell, add_heat_hashes and add_heat_h3s frame the points instead so
+        the base map still renders.
+        """
+        levels = counts if max_bins is None else quantize_counts(counts, max_bins)
+        colors = count_colors(levels)
+        if min_count > 1:
+            keep = counts >= min_count
+            cells, levels = cells[keep], levels[keep]
+        area = staticmaps.Area
+        transparent = staticmaps.TRANSPARENT
+        add = self.add_object
+        for points, level in zip(make_polys(cells), levels.tolist()):
+            add(area(points, fill_color=colors[level], width=1, color=transparent))
+        return len(cells)
+
+    def prefetch_tiles(self, trans: staticmaps.Transformer, max_workers: int = TILE_WORKERS) -> None:
+        """Download the map tiles covered by trans concurrently so rendering reads them from the cache.
+
+        Only done when the tile downloader is a CachingTileDownloader, since
+        any other downloader would fetch every tile a second time while rendering.
+        max_workers defaults to 2, the most parallel downloads the OSM tile usage policy allows.
+        """
+        if not isinstance(self._tile_downloader, CachingTileDownloader):
+            return
+        n = trans.number_of_tiles()
+        tiles = [(trans.zoom(), (trans.first_tile_x() + xx) % n, y)
+                 for y in range(trans.first_tile_y(), trans.first_tile_y() + trans.tiles_y())
+                 if 0 <= y < n
+                 for xx in range(trans.tiles_x())]
+
+        def fetch(tile):
+            try:
+                self._fetch_tile(*tile)
+            except Exception:
+                # Rendering fetches the tile again and reports the failure.
+                pass
+
+        with ThreadPoolExecutor(max_workers) as executor:
+            list(executor.map(fetch, tiles))
+
+    def transformer(self, width: int, height: int) -> staticmaps.Transformer:
+        center, zoom = self.determine_center_zoom(width, height)
+        if center is None or zoom is None:
+            raise RuntimeError('Cannot render map without center/zoom.')
+        return staticmaps.Transformer(width, height, zoom, center, self._tile_provider.tile_size())
+
+    def render_pillow_renderer(self, trans: staticmaps.Transformer) -> staticmaps.PillowRenderer:
+        """Draw the background, tiles and objects seen through trans, without attribution."""
+        renderer = staticmaps.PillowRenderer(trans)
+        renderer.render_background(self._background_color)
+        renderer.render_tiles(self._fetch_tile)
+        renderer.render_objects(self._objects)
+        return renderer
+
+    def render_pillow(self, width: int, height: int) -> Image.Image:
+        trans = self.transformer(width, height)
+        self.prefetch_tiles(trans)
+        renderer = self.render_pillow_renderer(trans)
+        renderer.render_attribution(self._tile_provider.attribution())
+        return renderer.image()
+
+    def render_pillow_region(
+        self,
+        center: s2sphere.LatLng,
+        zoom: int,
+        width: int,
+        height: int
+    ) -> Image.Image:
+        """Render the part of the map centered on center, without attribution."""
+        trans = staticmaps.Transformer(width, height, zoom, center, self._tile_provider.tile_size())
+        return self.render_pillow_renderer(trans).image()
+
+    def render_pillow_tiled(
+        self,
+        width: int,
+        height: int,
+        tile_grid: Tuple[int, int] = (2, 2),
+        processes: Optional[int] = None
+    ) -> Image.Image:
+        """Render the map as a grid of regions in worker processes and stitch them together.
+
+        The workers are spawned, so a script calling this must guard its
+        entry point with if __name__ == '__main__'.
+        """
+        columns, rows = tile_grid
+        if columns < 1 or rows < 1:
+            raise ValueError(f'tile_grid must be at least (1, 1), got {tile_grid}')
+        trans = self.transformer(width, height)
+        zoom = trans.zoom()
+        xs = np.linspace(0, width, columns + 1).round().astype(int).tolist()
+        ys = np.linspace(0, height, rows + 1).round().astype(int).tolist()
+        boxes = [(x0, y0, x1, y1) for y0, y1 in zip(ys, ys[1:]) for x0, x1 in zip(xs, xs[1:])]
+        regions = [(trans.pixel2ll((x0 + x1) / 2, (y0 + y1) / 2), zoom, x1 - x0, y1 - y0)
+                   for x0, y0, x1, y1 in boxes]
+        self.prefetch_tiles(trans)
+        max_workers = min(processes or os.cpu_count() or 1, len(regions))
+        # Forking after numba has started its worker threads leaves the
+        # child processes hanging, so the workers are spawned instead.
+        spawn = multiprocessing.get_context('spawn')
+        # The workers load the context from a file: passing it to the pool
+        # directly blocks the parent forever if a worker dies while starting.
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'context.pickle')
+            with open(path, 'wb') as f:
+                pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+            try:
+                with ProcessPoolExecutor(max_workers, spawn, load_worker_context, (path,)) as pool:
+                    images = list(pool.map(render_worker_region, *zip(*regions)))
+            except BrokenProcessPool:
+                # A spawned worker re-runs the main script, and dies if that renders again.
+                raise RuntimeError(
+                    'a tiled render worker exited while starting; scripts rendering tiled maps '
+                    "must guard their entry point with if __name__ == '__main__'") from None
+        renderer = staticmaps.PillowRenderer(trans)
+        for (x0, y0, _, _), image in zip(boxes, images):
+            renderer.image().paste(image, (x0, y0))
+        renderer.render_attribution(self._tile_provider.attribution())
+        return renderer.image()
+
+
+def load_worker_context(path: str) -> None:
+    """Pool initializer loading the context a tiled render's worker draws from."""
+    global worker_context
+    with open(path, 'rb') as f:
+        worker_context = pickle.load(f)
+
+
+def render_worker_region(center: s2sphere.LatLng, zoom: int, width: int, height: int) -> Image.Image:
+    assert worker_context is not None
+    return worker_context.render_pillow_region(center, zoom, width, height)
 
 
 def plot_heat_hashes(
@@ -103,12 +306,15 @@ def plot_heat_hashes(
     lons,
     percision,
     tileprovider=tp,
-    size=(800, 500)
+    size=(800, 500),
+    max_bins=None,
+    min_count=1,
+    backend='cpu'
 ):
-    context = Context()
-    context.set_tile_provider(tileprovider)
-    context.add_heat_hashes(lats, lons, percision)
-    return context.render_pillow(*size)
+    lats, lons = coordinate_arrays(lats, lons)
+    with reused_context(tileprovider) as context:
+        context.add_heat_hashes(lats, lons, percision, max_bins, min_count, backend)
+        return context.render_pillow(*size)
 
 
 def plot_heat_h3s(
@@ -116,12 +322,109 @@ def plot_heat_h3s(
     lons,
     precision,
     tileprovider=tp,
-    size=(800, 500)
+    size=(800, 500),
+    max_bins=None,
+    min_count=1
 ):
-    context = Context()
+    lats, lons = coordinate_arrays(lats, lons)
+    with reused_context(tileprovider) as context:
+        context.add_heat_h3s(lats, lons, precision, max_bins, min_count)
+        return context.render_pillow(*size)
+
+
+def plot_heat_hashes_tiled(
+    lats,
+    lons,
+    percision,
+    tileprovider=tp,
+    size=(800, 500),
+    max_bins=None,
+    min_count=1,
+    backend='cpu',
+    tile_grid=(2, 2)
+):
+    """Plot a geohash heatmap, rendering tile_grid regions of it in parallel worker processes.
+
+    The workers are spawned and re-run the calling script, so scripts
+    must guard their entry point with if __name__ == '__main__';
+    without the guard a RuntimeError is raised.
+    """
+    lats, lons = coordinate_arrays(lats, lons)
+    with reused_context(tileprovider) as context:
+        context.add_heat_hashes(lats, lons, percision, max_bins, min_count, backend)
+        width, height = size
+        return context.render_pillow_tiled(width, height, tile_grid=tile_grid)
+
+
+def plot_heat_h3s_tiled(
+    lats,
+    lons,
+    precision,
+    tileprovider=tp,
+    size=(800, 500),
+    max_bins=None,
+    min_count=1,
+    tile_grid=(2, 2)
+):
+    """Plot a H3 heatmap, rendering tile_grid regions of it in parallel worker processes.
+
+    The workers are spawned and re-run the calling script, so scripts
+    must guard their entry point with if __name__ == '__main__';
+    without the guard a RuntimeError is raised.
+    """
+    lats, lons = coordinate_arrays(lats, lons)
+    with reused_context(tileprovider) as context:
+        context.add_heat_h3s(lats, lons, precision, max_bins, min_count)
+        width, height = size
+        return context.render_pillow_tiled(width, height, tile_grid=tile_grid)
+
+
+@contextmanager
+def reused_context(tileprovider) -> Iterator[Context]:
+    """Yield this thread's Context set to tileprovider, resetting it afterwards."""
+    context = getattr(local, 'context', None)
+    if context is None:
+        context = local.context = Context()
     context.set_tile_provider(tileprovider)
-    context.add_heat_h3s(lats, lons, precision)
-    return context.render_pillow(*size)
+    try:
+        yield context
+    finally:
+        context.reset()
+
+
+def coordinate_arrays(lats, lons) -> Tuple[np.ndarray, np.ndarray]:
+    """Return lats and lons as float arrays, checking they are valid points.
+
+    float32 arrays are kept as float32 rather than copied to float64.
+    """
+    lats = float_array(lats)
+    lons = float_array(lons)
+    if lats.size == 0:
+        raise ValueError('lats and lons must not be empty')
+    if lats.ndim != 1 or lons.ndim != 1:
+        raise ValueError(f'lats and lons must be one-dimensional, got shapes {lats.shape} and {lons.shape}')
+    if lats.shape != lons.shape:
+        raise ValueError(f'lats and lons must have the same shape, got {lats.shape} and {lons.shape}')
+    if not np.isfinite(lats).all() or lats.min() < -90 or lats.max() > 90:
+        raise ValueError('lats must be finite and between -90 and 90')
+    if not np.isfinite(lons).all() or lons.min() < -180 or lons.max() > 180:
+        raise ValueError('lons must be finite and between -180 and 180')
+    return lats, lons
+
+
+def point_bounds(lats, lons) -> s2sphere.LatLngRect:
+    """Return the smallest latitude/longitude rectangle containing the points."""
+    return s2sphere.LatLngRect.from_point_pair(
+        from_degrees(np.min(lats), np.min(lons)),
+        from_degrees(np.max(lats), np.max(lons)))
+
+
+def quantize_counts(counts: np.ndarray, max_bins: int) -> np.ndarray:
+    """Bucket counts into at most max_bins quantile bins numbered from 1."""
+    if isinstance(max_bins, bool) or not isinstance(max_bins, (int, np.integer)) or max_bins < 1:
+        raise ValueError(f'max_bins must be an integer of at least 1, got {max_bins!r}')
+    edges = np.unique(np.quantile(counts, np.linspace(0, 1, max_bins + 1)))
+    return np.searchsorted(edges[1:-1], counts, side='right') + 1
 
 
 def density_colors(counts: list, transparency=150):
@@ -150,6 +453,13 @@ def density_colors(counts: list, transparency=150):
    return RangeKeyDict({r:c for r, c in zip(ranges, colors)})
 
 
+def count_colors(counts: np.ndarray, transparency=150) -> Dict[int, staticmaps.Color]:
+    """Map each distinct cell count to its density color."""
+    unique_counts = np.unique(counts).tolist()
+    colors = density_colors(unique_counts, transparency)
+    return {n: colors[n] for n in unique_counts}
+
+
 def plot_cluster(cluster, tileprovider=tp, size=(800, 500)):
     context = Context()
     context.set_tile_provider(tileprovider)
@@ -179,19 +489,130 @@ def plot_heat_map(super_cluster, p, tileprovider=tp, size=(800, 500)):
     return context.render_pillow(*size)
 
 
-def make_hash_poly_points(h) -> List:
-    b = pygeodesy.geohash.bounds(h)
-    sw = b.latS, b.lonW
-    nw = b.latN, b.lonW
-    ne = b.latN, b.lonE
-    se = b.latS, b.lonE
-    polygon = [sw, nw, ne, se, sw]
-    return [staticmaps.create_latlng(lat, lon) for lat, lon in polygon]
-
-
-def make_h3_poly_points(h: str) -> List:
-    points = list(h3.h3_to_geo_boundary(h, geo_json=True))
-    return [staticmaps.create_latlng(lat, lon) for lon, lat in points]
+def _compile_geohash_decoder(precision: int) -> GeohashDecoder:
+    """Return a bounds decoder for geohashes of length precision.
+
+    Each character position gets lookup tables of its bits already
+    shifted into the longitude and latitude cell indexes, and the
+    generated function sums them in straight-line code.
+    """
+    if precision in GEOHASH_DECODERS:
+        return GEOHASH_DECODERS[precision]
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    namespace: Dict[str, Any] = {
+        'LON_STEP': 360.0 / 2 ** lon_bits,
+        'LAT_STEP': 180.0 / 2 ** lat_bits,
+    }
+    for i in range(precision):
+        lon_table, lat_table = {}, {}
+        for char, value in GEOHASH_BASE32.items():
+            lon = lat = 0
+            for j in range(5):
+                bit = (value >> (4 - j)) & 1
+                k = 5 * i + j
+                if k % 2 == 0:
+                    lon |= bit << (lon_bits - 1 - k // 2)
+                else:
+                    lat |= bit << (lat_bits - 1 - k // 2)
+            lon_table[char] = lon
+            lat_table[char] = lat
+        namespace[f'LON{i}'] = lon_table
+        namespace[f'LAT{i}'] = lat_table
+    lon_sum = ' + '.join(f'LON{i}[h[{i}]]' for i in range(precision))
+    lat_sum = ' + '.join(f'LAT{i}[h[{i}]]' for i in range(precision))
+    source = '\n'.join([
+        'def decode(h):',
+        f'    lonW = ({lon_sum}) * LON_STEP - 180.0',
+        f'    latS = ({lat_sum}) * LAT_STEP - 90.0',
+        '    return latS, latS + LAT_STEP, lonW, lonW + LON_STEP',
+    ])
+    exec(source, namespace)
+    decoder: GeohashDecoder = namespace['decode']
+    GEOHASH_DECODERS[precision] = decoder
+    return decoder
+
+
+def _decode_bounds(h: str) -> Tuple[float, float, float, float]:
+    """Return the (latS, latN, lonW, lonE) bounds of a geohash."""
+    h = h.lower()
+    if not h:
+        raise ValueError('invalid geohash, got an empty string')
+    try:
+        if len(h) <= MAX_COMPILED_PRECISION:
+            return _compile_geohash_decoder(len(h))(h)
+        lat_lo, lat_hi = -90.0, 90.0
+        lon_lo, lon_hi = -180.0, 180.0
+        even = True
+        for char in h:
+            bits = GEOHASH_BASE32[char]
+            for mask in (16, 8, 4, 2, 1):
+                if even:
+                    mid = (lon_lo + lon_hi) / 2
+                    if bits & mask:
+                        lon_lo = mid
+                    else:
+                        lon_hi = mid
+                else:
+                    mid = (lat_lo + lat_hi) / 2
+                    if bits & mask:
+                        lat_lo = mid
+                    else:
+                        lat_hi = mid
+                even = not even
+    except KeyError:
+        raise ValueError(f'invalid geohash {h!r}') from None
+    return lat_lo, lat_hi, lon_lo, lon_hi
+
+
+@lru_cache(maxsize=65536)
+def make_hash_poly_points(h, closed: bool = True) -> Tuple[s2sphere.LatLng, ...]:
+    latS, latN, lonW, lonE = _decode_bounds(h)
+    sw = latS, lonW
+    nw = latN, lonW
+    ne = latN, lonE
+    se = latS, lonE
+    polygon = [sw, nw, ne, se, sw] if closed else [sw, nw, ne, se]
+    return tuple(from_degrees(lat, lon) for lat, lon in polygon)
+
+
+@lru_cache(maxsize=65536)
+def make_h3_poly_points(h, closed: bool = True) -> Tuple[s2sphere.LatLng, ...]:
+    if isinstance(h, str):
+        h = h3.str_to_int(h)
+    points = list(h3i.cell_to_boundary(h))
+    if closed:
+        points.append(points[0])
+    return tuple(from_degrees(lat, lon) for lat, lon in points)
+
+
+def make_hash_polys(hashes: np.ndarray, closed: bool = True) -> List[Tuple[s2sphere.LatLng, ...]]:
+    """Return the polygon points of each geohash.
+
+    Areas close their fill themselves but draw their outline as an open
+    line, so closed=False is only safe for areas with width 0.
+    """
+    return [make_hash_poly_points(h, closed) for h in hashes.tolist()]
+
+
+def make_h3_polys(cells: np.ndarray, closed: bool = True) -> List[Tuple[s2sphere.LatLng, ...]]:
+    """Return the polygon points of each H3 cell.
+
+    Decodes all boundaries in one call with h3ronpy and shapely
+    when both are installed.
+    """
+    if h3vector is None or shapely is None:
+        return [make_h3_poly_points(h, closed) for h in cells.tolist()]
+    wkb = h3vector.cells_to_wkb_polygons(np.asarray(cells, dtype=np.uint64))
+    polygons = shapely.from_wkb(wkb.to_pylist())
+    coords, index = shapely.get_coordinates(polygons, return_index=True)
+    if not closed:
+        keep = np.ones(len(index), dtype=bool)
+        keep[np.cumsum(np.bincount(index, minlength=len(cells))) - 1] = False
+        coords, index = coords[keep], index[keep]
+    points = [from_degrees(lat, lon) for lon, lat in coords.tolist()]
+    ends = np.cumsum(np.bincount(index, minlength=len(cells))).tolist()
+    return [tuple(points[start:end]) for start, end in zip([0] + ends[:-1], ends)]
 
 
 def plot_hash(h, tileprovider=tp, size=(800, 500)):
@@ -229,5 +650,59 @@ def plot_nine(h, tileprovider=tp, size=(800, 500)):
     return context.render_pillow(*size)
 
 
-def calculate_h3_hashes(latitudes, longitudes, precision) -> List[str]:
-    return [h3.geo_to_h3(lat, lon, precision) for lat, lon in zip(latitudes, longitudes)]
\ No newline at end of file
+def calculate_hashes(lats, lons, precision) -> np.ndarray:
+    """Return the geohashes of the points as a unicode array.
+
+    Uses the numba batch encoder when numba is installed,
+    otherwise falls back to geodude.
+    """
+    if HAVE_NUMBA:
+        return encode_geohashes(lats, lons, precision)
+    lats = np.asarray(lats, dtype=np.float64).tolist()
+    lons = np.asarray(lons, dtype=np.float64).tolist()
+    return np.array(calculate_geohashes(lats, lons, precision), dtype=f'U{precision}')
+
+
+def count_hashes(lats, lons, precision, backend: str = 'cpu') -> Tuple[np.ndarray, np.ndarray]:
+    """Return the distinct geohashes of the points and how many points fall in each.
+
+    With numba the points are counted as integer codes,
+    so only the distinct cells are turned into strings.
+    backend='cuda' encodes the points on the GPU with numba.cuda.
+    """
+    if backend == 'cuda':
+        # Imported here so CPU-only users never load numba.cuda.
+        try:
+            from heatfall._cudageohash import encode_geohash_codes_cuda
+        except ImportError:
+            raise ValueError("backend='cuda' requires numba") from None
+        codes = encode_geohash_codes_cuda(lats, lons, precision)
+    elif backend != 'cpu':
+        raise ValueError(f"backend must be 'cpu' or 'cuda', got {backend!r}")
+    elif not HAVE_NUMBA:
+        return np.unique(calculate_hashes(lats, lons, precision), return_counts=True)
+    else:
+        codes = encode_geohash_codes(lats, lons, precision)
+    codes, counts = np.unique(codes, return_counts=True)
+    return codes_to_geohashes(codes, precision), counts
+
+
+def calculate_h3_hashes(latitudes, longitudes, precision) -> np.ndarray:
+    """Return the H3 cells of the points as a uint64 array.
+
+    Uses the h3ronpy bulk encoder when it is installed,
+    otherwise falls back to h3's integer API.
+    """
+    if isinstance(precision, bool) or not isinstance(precision, (int, np.integer)) or not 0 <= precision <= 15:
+        raise ValueError(f'Precision must be an integer between 0 and 15, got {precision}')
+    precision = int(precision)
+    lats = np.asarray(latitudes, dtype=np.float64)
+    lons = np.asarray(longitudes, dtype=np.float64)
+    if h3vector is not None:
+        cells = h3vector.coordinates_to_cells(lats, lons, precision)
+        return np.asarray(cells, dtype=np.uint64)
+    return np.fromiter(
+        (h3i.latlng_to_cell(lat, lon, precision)
+         for lat, lon in zip(lats.tolist(), lons.tolist())),
+        dtype=np.uint64,
+        count=lats.size)
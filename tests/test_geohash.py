@@ -0,0 +1,50 @@
+import numpy as np
+import pygeodesy
+import pytest
+from geodude import calculate_geohashes
+
+from heatfall.heat import _decode_bounds
+
+PRECISIONS = range(1, 13)
+
+
+@pytest.fixture(scope='module')
+def points():
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(-90, 90, 20000)
+    lons = rng.uniform(-180, 180, 20000)
+    edge_lats = [90.0, -90.0, 0.0, 90.0, -90.0, 0.0, 45.0, -45.0]
+    edge_lons = [180.0, -180.0, 0.0, -180.0, 180.0, 180.0, -180.0, 0.0]
+    return np.concatenate([lats, edge_lats]), np.concatenate([lons, edge_lons])
+
+
+@pytest.mark.parametrize('precision', PRECISIONS)
+def test_encode_geohashes_matches_geodude(points, precision):
+    nbgeohash = pytest.importorskip('heatfall._nbgeohash')
+    lats, lons = points
+    expected = calculate_geohashes(lats.tolist(), lons.tolist(), precision)
+    result = nbgeohash.encode_geohashes(lats, lons, precision)
+    assert result.tolist() == expected
+
+
+@pytest.mark.parametrize('precision', PRECISIONS)
+def test_geohash_codes_match_geodude(points, precision):
+    nbgeohash = pytest.importorskip('heatfall._nbgeohash')
+    lats, lons = points
+    expected = calculate_geohashes(lats.tolist(), lons.tolist(), precision)
+    codes = nbgeohash.encode_geohash_codes(lats, lons, precision)
+    assert nbgeohash.codes_to_geohashes(codes, precision).tolist() == expected
+
+
+@pytest.mark.parametrize('precision', PRECISIONS)
+def test_decode_bounds_matches_pygeodesy(points, precision):
+    lats, lons = points
+    for h in calculate_geohashes(lats[::20].tolist(), lons[::20].tolist(), precision):
+        b = pygeodesy.geohash.bounds(h)
+        assert _decode_bounds(h) == (b.latS, b.latN, b.lonW, b.lonE)
+
+
+@pytest.mark.parametrize('h', ['', 'a', 'u4pruydqqvja', 'u4pruydqqvjaa'])
+def test_decode_bounds_rejects_invalid_geohashes(h):
+    with pytest.raises(ValueError):
+        _decode_bounds(h)
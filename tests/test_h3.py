@@ -0,0 +1,37 @@
+import h3
+import numpy as np
+import pytest
+
+import heatfall.heat
+from heatfall.heat import calculate_h3_hashes
+
+
+@pytest.fixture(scope='module')
+def points():
+    rng = np.random.default_rng(0)
+    return rng.uniform(-90, 90, 2000), rng.uniform(-180, 180, 2000)
+
+
+@pytest.mark.parametrize('precision', [0, 7, np.int64(9), 15])
+def test_calculate_h3_hashes_matches_h3(points, precision):
+    lats, lons = points
+    expected = [h3.str_to_int(h3.latlng_to_cell(lat, lon, int(precision))) for lat, lon in zip(lats, lons)]
+    cells = calculate_h3_hashes(lats, lons, precision)
+    assert cells.dtype == np.uint64
+    assert cells.tolist() == expected
+
+
+@pytest.mark.parametrize('precision', [0, 7, np.int64(9), 15])
+def test_calculate_h3_hashes_fallback_matches_h3ronpy(points, precision, monkeypatch):
+    pytest.importorskip('h3ronpy')
+    lats, lons = points
+    expected = calculate_h3_hashes(lats, lons, precision)
+    monkeypatch.setattr(heatfall.heat, 'h3vector', None)
+    assert calculate_h3_hashes(lats, lons, precision).tolist() == expected.tolist()
+
+
+@pytest.mark.parametrize('precision', [-1, 16, 7.0, True, '7', None])
+def test_calculate_h3_hashes_rejects_invalid_precision(points, precision):
+    lats, lons = points
+    with pytest.raises(ValueError):
+        calculate_h3_hashes(lats, lons, precision)
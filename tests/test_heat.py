@@ -0,0 +1,119 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+import staticmaps
+
+from heatfall.heat import Context, coordinate_arrays, quantize_counts, reused_context
+
+BLANK = staticmaps.TileProvider('blank', url_pattern='', attribution='blank')
+
+
+@pytest.fixture(scope='module')
+def points():
+    rng = np.random.default_rng(0)
+    return rng.normal(40.7, 0.05, 5000), rng.normal(-74.0, 0.05, 5000)
+
+
+def test_reused_context_starts_fresh():
+    with reused_context(staticmaps.tile_provider_OSM) as context:
+        context.add_hash_poly('u4pr', staticmaps.RED, 1, staticmaps.RED)
+        context.set_zoom(3)
+        context.set_background_color(staticmaps.WHITE)
+    assert vars(context) == {**vars(Context()), '_tile_provider': context._tile_provider}
+
+
+def test_render_pillow_tiled_matches_render_pillow(points):
+    context = Context()
+    context.set_tile_provider(BLANK)
+    context.add_heat_hashes(*points, 6)
+    width, height = 400, 300
+    expected = np.asarray(context.render_pillow(width, height))
+    result = np.asarray(context.render_pillow_tiled(width, height, tile_grid=(2, 3), processes=2))
+    assert result.shape == expected.shape
+    # Antialiased edges crossing a seam are drawn twice, once in each region.
+    ys, xs = np.nonzero((result != expected).any(axis=-1))
+    assert len(ys) < 0.001 * width * height
+    assert np.all((np.abs(xs - width / 2) <= 2) | (np.min(np.abs(ys[:, None] - [100, 200]), axis=1) <= 2))
+
+
+@pytest.mark.parametrize('tile_grid', [(0, 2), (2, 0), (-1, 1)])
+def test_render_pillow_tiled_rejects_empty_grids(points, tile_grid):
+    context = Context()
+    context.set_tile_provider(BLANK)
+    context.add_heat_hashes(*points, 6)
+    with pytest.raises(ValueError):
+        context.render_pillow_tiled(400, 300, tile_grid=tile_grid)
+
+
+def test_tiled_render_fails_fast_without_main_guard(tmp_path):
+    script = tmp_path / 'unguarded.py'
+    script.write_text(
+        'import staticmaps\n'
+        'from heatfall import plot_heat_hashes_tiled\n'
+        "blank = staticmaps.TileProvider('blank', url_pattern='', attribution='blank')\n"
+        'plot_heat_hashes_tiled([40.7, 40.8], [-74.0, -74.1], 5, tileprovider=blank)\n'
+    )
+    result = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, timeout=120)
+    assert result.returncode != 0
+    assert "if __name__ == '__main__'" in result.stderr.splitlines()[-1]
+
+
+def heat_areas(add_heat, points, precision, **kwargs):
+    context = Context()
+    getattr(context, add_heat)(*points, precision, **kwargs)
+    return context._objects
+
+
+@pytest.mark.parametrize('add_heat, precision', [('add_heat_hashes', 6), ('add_heat_h3s', 8)])
+@pytest.mark.parametrize('max_bins', [None, 3])
+def test_min_count_drops_cells_without_recoloring_the_rest(points, add_heat, precision, max_bins):
+    areas = heat_areas(add_heat, points, precision, max_bins=max_bins)
+    filtered = heat_areas(add_heat, points, precision, max_bins=max_bins, min_count=5)
+    colors = {tuple(area.interpolate()): area.fill_color().int_rgba() for area in areas}
+    assert 0 < len(filtered) < len(areas)
+    for area in filtered:
+        assert area.fill_color().int_rgba() == colors[tuple(area.interpolate())]
+
+
+@pytest.mark.parametrize('add_heat, precision', [('add_heat_hashes', 6), ('add_heat_h3s', 8)])
+def test_min_count_above_every_cell_still_renders(points, add_heat, precision):
+    context = Context()
+    context.set_tile_provider(BLANK)
+    getattr(context, add_heat)(*points, precision, min_count=len(points[0]) + 1)
+    assert not context._objects
+    assert context.render_pillow(400, 300).size == (400, 300)
+
+
+@pytest.mark.parametrize('lats, lons', [
+    ([], []),
+    ([1.0, 2.0], [1.0]),
+    ([[1.0, 2.0]], [[1.0, 2.0]]),
+    ([91.0], [0.0]),
+    ([0.0], [-180.5]),
+    ([np.nan], [0.0]),
+])
+def test_coordinate_arrays_rejects_invalid_points(lats, lons):
+    with pytest.raises(ValueError):
+        coordinate_arrays(lats, lons)
+
+
+@pytest.mark.parametrize('max_bins', [1, 4, np.int64(8)])
+def test_quantize_counts_skewed(max_bins):
+    counts = np.random.default_rng(0).geometric(0.05, 1000) ** 2
+    bins = quantize_counts(counts, max_bins)
+    order = np.argsort(counts, kind='stable')
+    assert bins.min() == 1 and bins.max() == max_bins
+    assert np.all(np.diff(bins[order]) >= 0)
+    assert bins[counts.argmax()] == max_bins
+
+
+def test_quantize_counts_all_equal():
+    assert quantize_counts(np.full(10, 7), 4).tolist() == [1] * 10
+
+
+@pytest.mark.parametrize('max_bins', [0, -1, 2.5, 3.0, True, '3'])
+def test_quantize_counts_rejects_invalid_max_bins(max_bins):
+    with pytest.raises(ValueError):
+        quantize_counts(np.arange(1, 11), max_bins)
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+import staticmaps
+
+from heatfall._tile_cache import CachingTileDownloader
+
+PROVIDER = staticmaps.TileProvider('test', url_pattern='https://tiles.test/$z/$x/$y.png')
+
+
+class StubDownloader(staticmaps.TileDownloader):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def get(self, provider, cache_dir, zoom, x, y):
+        self.calls.append((cache_dir, zoom, x, y))
+        return f'{zoom}/{x}/{y}'.encode()
+
+
+@pytest.fixture
+def base():
+    return StubDownloader()
+
+
+def test_miss_fetches_once_then_hits(tmp_path, base):
+    downloader = CachingTileDownloader(base, tmp_path)
+    assert downloader.get(PROVIDER, None, 3, 1, 2) == b'3/1/2'
+    assert downloader.get(PROVIDER, None, 3, 1, 2) == b'3/1/2'
+    assert base.calls == [(None, 3, 1, 2)]
+    assert len(list(tmp_path.glob('*.png'))) == 1
+
+
+def test_context_cache_dir_overrides_own(tmp_path, base):
+    own, context_dir = tmp_path / 'own', tmp_path / 'context'
+    downloader = CachingTileDownloader(base, own)
+    downloader.get(PROVIDER, str(context_dir), 3, 1, 2)
+    assert len(list(context_dir.glob('*.png'))) == 1
+    assert not own.exists()
+    downloader.get(PROVIDER, None, 3, 1, 2)
+    assert len(list(own.glob('*.png'))) == 1
+    assert len(base.calls) == 2
+
+
+def test_provider_without_tiles_is_not_cached(tmp_path, base):
+    downloader = CachingTileDownloader(base, tmp_path)
+    blank = staticmaps.TileProvider('blank', url_pattern='')
+    assert downloader.get(blank, None, 3, 1, 2) is None
+    assert not base.calls
+    assert not list(tmp_path.iterdir())
+
+
+def test_evicts_least_recently_used_down_to_90_percent(tmp_path, base):
+    downloader = CachingTileDownloader(base, tmp_path, max_tiles=10)
+    for x in range(10):
+        downloader.get(PROVIDER, None, 5, x, 0)
+        os.utime(downloader.tile_path(None, PROVIDER.url(5, x, 0)), (x, x))
+    # A hit marks tile 0 as the most recently used.
+    downloader.get(PROVIDER, None, 5, 0, 0)
+    downloader.get(PROVIDER, None, 5, 10, 0)
+    remaining = {path.name for path in tmp_path.glob('*.png')}
+    expected = {downloader.tile_path(None, PROVIDER.url(5, x, 0)).name for x in [0, *range(3, 11)]}
+    assert remaining == expected